@@ -0,0 +1,6 @@
+"""
+Email notifications for Frigate events received over MQTT.
+
+Only the standard library is imported here; paho, requests and the email
+stack are imported when they are first used.
+"""
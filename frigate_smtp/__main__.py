@@ -0,0 +1,8 @@
+import time
+
+STARTED = time.perf_counter()
+
+from frigate_smtp.app import main
+
+if __name__ == "__main__":
+    main(started=STARTED)
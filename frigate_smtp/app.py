@@ -0,0 +1,258 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from frigate_smtp.config import config_from_env, load_alert_rules, load_config, load_sources
+from frigate_smtp.mailer import send_email
+from frigate_smtp.rules import normalize_rules, rule_allows_event
+from frigate_smtp.snapshots import SnapshotFetcher
+
+logger = logging.getLogger(__name__)
+
+DEBUG_EVENT_DELAY = 7.5
+
+
+def camera_key(source, camera):
+    """
+    Namespace a camera name by its source so identical names on different Frigate servers stay distinct.
+    """
+    return f"{source['name']}/{camera}" if source["name"] else camera
+
+
+class Notifier:
+    """
+    Shared rule engine, worker pool and SMTP path behind one MQTT client per source.
+    """
+
+    def __init__(self, config, alert_rules, debug=False, started=None):
+        self.smtp_config = config["smtp"]
+        self.sources = load_sources(config)
+        self.alert_rules = normalize_rules(alert_rules)
+        self.debug = debug
+        # In debug mode wait before sending so snapshots from follow-up messages can accumulate
+        self.event_delay = DEBUG_EVENT_DELAY if debug else 0
+        self.started = time.perf_counter() if started is None else started
+        self.event_cache = {}
+        self.event_cache_lock = threading.Lock()
+        self.snapshots = SnapshotFetcher(**config.get("snapshots", {}))
+        self.executor = ThreadPoolExecutor(max_workers=config.get("workers", 4), thread_name_prefix="event")
+        self.pending_subscriptions = {source["name"] for source in self.sources}
+        self.clients = []
+
+    def handle_event(self, cache_key):
+        with self.event_cache_lock:
+            if self.debug:
+                # Like the old log.py: forget the event once handled, later messages start a new one
+                event_info = self.event_cache.pop(cache_key, None)
+            else:
+                event_info = self.event_cache.get(cache_key)
+        if not event_info:
+            return
+
+        source = event_info['source']
+        event_id = event_info['event_id']
+
+        # Don’t send again if already emailed
+        if event_info.get("emailed"):
+            logger.debug(f"Skipping already emailed event: {event_id}")
+            return
+
+        clip_url = f"{source['clip_base_url']}/notifications/{event_id}/{event_info['frigate_camera']}/clip.mp4"
+        message = f"A {event_info['event_label']} was detected on camera: {event_info['camera']}.\nEvent ID: {event_id}"
+        subject = f"{event_info['event_label']} detected!"
+        if self.debug:
+            subject = f"(Test) {subject}"
+
+        # Copy so snapshots still arriving on the MQTT thread don't change the list mid-iteration
+        with self.event_cache_lock:
+            snapshot_urls = list(event_info['snapshot_urls'])
+
+        snapshots = []
+        for snapshot_url in snapshot_urls:
+            image_bytes = self.snapshots.fetch(snapshot_url)
+            if image_bytes:
+                snapshots.append(image_bytes)
+        send_email(self.smtp_config, subject, message, snapshots, clip_url)
+
+        event_info['emailed'] = True
+        logger.info(f"Processed and emailed event: {event_id}")
+
+    def on_message(self, client, userdata, message):
+        source = userdata["source"]
+        try:
+            event_data = json.loads(message.payload.decode("utf-8"))
+            logger.debug(f"Received MQTT message from source '{source['name']}': {event_data}")
+            if event_data.get("type") != "new":
+                return
+
+            after = event_data.get("after")
+            if not after:
+                return
+
+            event_label = after.get("label")
+            event_id = after.get("id")
+            frigate_camera = after.get("camera")
+            zones = after.get("current_zones") or after.get("entered_zones") or []
+
+            if not event_label or not event_id or not frigate_camera:
+                return
+
+            camera = camera_key(source, frigate_camera)
+
+            if not rule_allows_event(self.alert_rules, camera, event_label, zones):
+                logger.info(f"Event from camera '{camera}' with label '{event_label}' and zones '{zones}' blocked by alert rules.")
+                return
+
+            snapshot_url = f"{source['snapshot_base_url']}/notifications/{event_id}/snapshot.jpg"
+            cache_key = (source["name"], event_id)
+
+            with self.event_cache_lock:
+                first_seen = cache_key not in self.event_cache
+                if first_seen:
+                    self.event_cache[cache_key] = {
+                        'source': source,
+                        'event_id': event_id,
+                        'event_label': event_label,
+                        'camera': camera,
+                        'frigate_camera': frigate_camera,
+                        'snapshot_urls': [snapshot_url],
+                        'emailed': False
+                    }
+                else:
+                    # Already seen this event → just collect snapshots
+                    self.event_cache[cache_key]['snapshot_urls'].append(snapshot_url)
+
+            if first_seen and self.event_delay:
+                # Wait on a timer rather than in a worker, so a burst of events doesn't hold up the pool
+                timer = threading.Timer(self.event_delay, self.executor.submit, (self.handle_event, cache_key))
+                timer.daemon = True
+                timer.start()
+            elif first_seen:
+                # Send email immediately on the shared worker pool
+                self.executor.submit(self.handle_event, cache_key)
+
+            logger.info(f"Received event: {event_label} from {camera} (Event ID: {event_id}, Zones: {zones})")
+
+        except Exception as e:
+            logger.error(f"Error processing MQTT message: {e}")
+
+    def on_connect(self, client, userdata, flags, rc, properties=None):
+        source = userdata["source"]
+        if rc != 0:
+            logger.error(f"MQTT connection to broker {source['broker_ip']} (source '{source['name']}') failed with code {rc}")
+            return
+
+        topic = f"{source['topic_prefix']}/events"
+        if userdata.get("first_connect", True):
+            client.subscribe(topic)
+            logger.info(f"Connected to MQTT broker {source['broker_ip']} and subscribing to {topic}")
+            userdata["first_connect"] = False
+        else:
+            logger.debug(f"Reconnected to MQTT broker {source['broker_ip']}")
+
+    def on_connect_fail(self, client, userdata):
+        # Called by the network thread when it can't reach the broker at all (DNS, refused, timeout)
+        source = userdata["source"]
+        logger.error(f"MQTT connection to broker {source['broker_ip']} (source '{source['name']}') failed. Retrying...")
+
+    def on_disconnect(self, client, userdata, rc, *args):
+        if rc != 0:
+            source = userdata["source"]
+            logger.warning(f"Disconnected from MQTT broker {source['broker_ip']} (source '{source['name']}') with code {rc}. Reconnecting...")
+
+    def on_subscribe(self, client, userdata, mid, *args):
+        source = userdata["source"]
+        name = source["name"]
+        if name not in self.pending_subscriptions:
+            return
+
+        # Granted QoS (MQTT 3.1.1) or reason codes (MQTT 5); 0x80 and above means the broker refused
+        codes = args[0] if args else []
+        refused = [code for code in codes if getattr(code, "value", code) >= 0x80]
+        if refused:
+            logger.error(f"MQTT broker {source['broker_ip']} refused subscription to {source['topic_prefix']}/events: {refused}")
+            return
+
+        self.pending_subscriptions.discard(name)
+        elapsed = time.perf_counter() - self.started
+        logger.info(f"Subscribed to source '{name or source['broker_ip']}' {elapsed:.2f}s after startup")
+        if not self.pending_subscriptions:
+            logger.info(f"Time to subscribed: {elapsed:.2f}s for {len(self.sources)} source(s)")
+
+    def start_source(self, source):
+        import paho.mqtt.client as mqtt
+
+        client_id = f"frigate_smtp_{source['name']}" if source["name"] else "frigate_smtp"
+        client = mqtt.Client(
+            client_id=client_id,
+            protocol=mqtt.MQTTv5,
+            userdata={"first_connect": True, "source": source}
+        )
+        client.username_pw_set(source["username"], source["password"])
+        client.on_connect = self.on_connect
+        client.on_message = self.on_message
+        client.on_subscribe = self.on_subscribe
+        client.on_connect_fail = self.on_connect_fail
+        client.on_disconnect = self.on_disconnect
+        client.reconnect_delay_set(min_delay=1, max_delay=5)
+
+        # The network thread keeps retrying the first connection too, so one unreachable broker doesn't block the others
+        logger.info(f"Connecting to MQTT broker {source['broker_ip']}...")
+        client.connect_async(source["broker_ip"], source["port"], 60)
+        client.loop_start()
+        return client
+
+    def run(self):
+        self.clients = [self.start_source(source) for source in self.sources]
+        logger.info(f"Started {len(self.clients)} MQTT source(s)")
+        while True:
+            time.sleep(1)
+
+
+def setup_logging(debug):
+    if debug:
+        logging.basicConfig(
+            level=logging.DEBUG,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler("frigate_event_notifier.log"),
+                logging.StreamHandler()
+            ]
+        )
+    else:
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s [%(levelname)s] %(message)s'
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Send email notifications for Frigate events.")
+    parser.add_argument("--config", default="config.json", help="Path to config.json")
+    parser.add_argument("--config-from-env", action="store_true",
+                        help="Build the config from environment variables instead of reading config.json")
+    parser.add_argument("--rules", default=os.getenv("ALERT_RULES_FILE", "alert_rules.json"),
+                        help="Path to alert_rules.json")
+    parser.add_argument("--debug", action="store_true",
+                        default=os.getenv("DEBUG", "").lower() in ("1", "true", "yes"),
+                        help="Verbose logging to frigate_event_notifier.log, test subjects and delayed sending")
+    return parser.parse_args(argv)
+
+
+def main(argv=None, started=None):
+    started = time.perf_counter() if started is None else started
+    args = parse_args(argv)
+    setup_logging(args.debug)
+
+    if args.debug:
+        logger.warning("WARNING: USE THIS FOR TESTING AND DEBUGGING ONLY!")
+
+    config = config_from_env() if args.config_from_env else load_config(args.config)
+    alert_rules = load_alert_rules(config, args.rules)
+    notifier = Notifier(config, alert_rules, debug=args.debug, started=started)
+    logger.info(f"Startup took {time.perf_counter() - started:.2f}s before connecting to MQTT")
+    notifier.run()
@@ -0,0 +1,94 @@
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def load_config(path="config.json"):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def config_from_env(environ=None):
+    """
+    Build the same config that config.json holds from environment variables,
+    so the container doesn't need to write a file before starting.
+    """
+    env = os.environ if environ is None else environ
+    config = {
+        "smtp": {
+            "server": env.get("SMTP_SERVER", ""),
+            "port": int(env.get("SMTP_PORT", 587)),
+            "username": env.get("SMTP_USERNAME", ""),
+            "password": env.get("SMTP_PASSWORD", ""),
+            "from": env.get("EMAIL_FROM", ""),
+            "to": env.get("EMAIL_TO", "").split(",")
+        },
+        "homeassistant_url": env.get("HOMEASSISTANT_URL", ""),
+        "homeassistant_ip": env.get("HOMEASSISTANT_IP", ""),
+        "mqtt": {
+            "broker_ip": env.get("MQTT_BROKER_IP", ""),
+            "port": int(env.get("MQTT_PORT", 1883)),
+            "username": env.get("MQTT_USERNAME", ""),
+            "password": env.get("MQTT_PASSWORD", "")
+        },
+        "workers": int(env.get("WORKERS", 4)),
+        "snapshots": {
+            "deadline": float(env.get("SNAPSHOT_DEADLINE", 8)),
+            "cooldown": float(env.get("SNAPSHOT_COOLDOWN", 30))
+        }
+    }
+
+    # Multiple Frigate instances: JSON list of sources, missing keys fall back to the MQTT_* / HOMEASSISTANT_* values
+    sources = env.get("SOURCES", "")
+    if sources:
+        config["sources"] = json.loads(sources)
+
+    return config
+
+
+def load_alert_rules(config, path="alert_rules.json"):
+    """
+    Return the alert rules embedded in the config, or read them from `path`.
+    """
+    if "alert_rules" in config:
+        alert_rules_raw = config["alert_rules"]
+    else:
+        try:
+            with open(path, "r") as f:
+                alert_rules_raw = json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load {path}, no events will be processed: {e}")
+            return {}
+    logger.info(f"Loaded alert rules: {alert_rules_raw}")
+    return alert_rules_raw
+
+
+def load_sources(config):
+    """
+    Build the list of Frigate sources, falling back to the single top-level
+    "mqtt"/"homeassistant_*" settings when no "sources" list is configured.
+    """
+    homeassistant_url = config.get("homeassistant_url", "")
+    homeassistant_ip = config.get("homeassistant_ip") or homeassistant_url
+    mqtt_defaults = config.get("mqtt", {})
+    sources = []
+    for src in config.get("sources") or [{}]:
+        src_url = src.get("homeassistant_url", homeassistant_url)
+        src_ip = src.get("homeassistant_ip") or src.get("homeassistant_url") or homeassistant_ip
+        sources.append({
+            "name": src.get("name", ""),
+            "broker_ip": src.get("broker_ip", mqtt_defaults.get("broker_ip")),
+            "port": src.get("port", mqtt_defaults.get("port", 1883)),
+            "username": src.get("username", mqtt_defaults.get("username")),
+            "password": src.get("password", mqtt_defaults.get("password")),
+            "topic_prefix": src.get("topic_prefix", "frigate").rstrip("/"),
+            "snapshot_base_url": src.get("snapshot_base_url", f"{src_ip}/api/frigate").rstrip("/"),
+            "clip_base_url": src.get("clip_base_url", f"{src_url}/api/frigate").rstrip("/"),
+        })
+
+    names = [src["name"] for src in sources]
+    if len(sources) > 1 and (not all(names) or len(set(names)) != len(names)):
+        raise ValueError(f"Each source needs a unique name when more than one is configured, got: {names}")
+    return sources
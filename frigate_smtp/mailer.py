@@ -0,0 +1,32 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def send_email(smtp_config, subject, message, snapshots, clip_url):
+    # The email stack and smtplib are only needed once the first alert goes out
+    import smtplib
+    from email.mime.image import MIMEImage
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
+    email_to = smtp_config["to"]
+    msg = MIMEMultipart()
+    msg['Subject'] = subject
+    msg['From'] = smtp_config["from"]
+    msg['To'] = ", ".join(email_to)
+
+    body = f"{message}\n\nClip: {clip_url}"
+    msg.attach(MIMEText(body))
+
+    for image_bytes in snapshots:
+        msg.attach(MIMEImage(image_bytes, name="snapshot.jpg"))
+
+    try:
+        with smtplib.SMTP(smtp_config["server"], smtp_config["port"], timeout=10) as server:
+            server.starttls()
+            server.login(smtp_config["username"], smtp_config["password"])
+            server.sendmail(smtp_config["from"], email_to, msg.as_string())
+        logger.info(f"Email sent: {subject} to {', '.join(email_to)}")
+    except Exception as e:
+        logger.error(f"Failed to send email: {e}")
@@ -0,0 +1,43 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_rules(alert_rules_raw):
+    alert_rules = {}
+    for cam, rules in alert_rules_raw.items():
+        alert_rules[cam.lower()] = {
+            "labels": [lbl.lower() for lbl in rules.get("labels", [])],
+            "ignore": [lbl.lower() for lbl in rules.get("ignore", [])],
+            "zones": [zone.lower() for zone in rules.get("zones", [])]
+        }
+    return alert_rules
+
+
+def rule_allows_event(alert_rules, camera, label, zones):
+    cam_key = camera.lower()
+    lbl = label.lower()
+    zones_check = [z.lower() for z in zones] if zones else []
+
+    if cam_key not in alert_rules:
+        logger.debug(f"Camera '{camera}' not in alert rules — event blocked")
+        return False
+
+    rule = alert_rules[cam_key]
+
+    if rule["labels"] and lbl not in rule["labels"]:
+        logger.debug(f"Label '{label}' not allowed for camera '{camera}' — event blocked")
+        return False
+    if rule["ignore"] and lbl in rule["ignore"]:
+        logger.debug(f"Label '{label}' is ignored for camera '{camera}' — event blocked")
+        return False
+    if rule["zones"]:
+        if not zones_check:
+            logger.debug("No zone info in event but zones filter present — event blocked")
+            return False
+        if not any(zone in rule["zones"] for zone in zones_check):
+            logger.debug(f"Zones {zones} not allowed for camera '{camera}' — event blocked")
+            return False
+
+    logger.debug(f"Event allowed for camera '{camera}', label '{label}', zones '{zones}'")
+    return True
@@ -0,0 +1,199 @@
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Outcomes of a single snapshot request
+OK = "ok"
+NOT_READY = "not_ready"
+SERVER_ERROR = "server_error"
+TIMEOUT = "timeout"
+FAILED = "failed"
+ERROR = "error"
+
+
+class CircuitBreaker:
+    """
+    Stops requests to an endpoint after repeated failures, letting one trial
+    request through once the cooldown has passed.
+
+    `allow()` returns a ticket (or None when the request must be skipped) that
+    is passed back to `record_success`, `record_failure` or `release`. While
+    the breaker is open only the request holding the trial ticket can close
+    it or end the trial; late results from older requests are ignored.
+    """
+
+    def __init__(self, failure_threshold=3, cooldown=30):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return object()
+            if self.trial is not None or time.monotonic() - self.opened_at < self.cooldown:
+                return None
+            self.trial = object()
+            return self.trial
+
+    def record_success(self, ticket):
+        with self.lock:
+            if self.opened_at is not None and ticket is not self.trial:
+                # Started before the breaker opened, only the trial decides when it closes
+                return
+            if self.opened_at is not None:
+                logger.info("Snapshot endpoint recovered, closing circuit breaker")
+            self.failures = 0
+            self.opened_at = None
+            self.trial = None
+
+    def record_failure(self, ticket):
+        with self.lock:
+            self.failures += 1
+            if ticket is self.trial:
+                # The trial failed, stay open for another cooldown
+                self.trial = None
+                self.opened_at = time.monotonic()
+                logger.warning(f"Snapshot endpoint still failing, sending alerts without images for {self.cooldown}s")
+            elif self.opened_at is None and self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                logger.warning(f"Snapshot endpoint failed {self.failures} time(s), sending alerts without images for {self.cooldown}s")
+
+    def release(self, ticket):
+        """
+        End a request that says nothing about the endpoint's health.
+        """
+        with self.lock:
+            if ticket is self.trial:
+                self.trial = None
+
+
+class SnapshotFetcher:
+    """
+    Fetch snapshots with jittered exponential backoff.
+
+    A 404 or non-image response means Frigate hasn't written the snapshot yet
+    and is retried quickly. Server errors are retried more slowly and, like
+    timeouts, count against a circuit breaker shared by every URL on the same
+    host, so during an outage alerts go out without images immediately.
+    URLs that never became ready or were rejected are remembered for
+    `negative_ttl` seconds so later messages for the same event skip them.
+    """
+
+    def __init__(self, timeout=5, deadline=8, not_ready_delay=0.25, server_error_delay=1, max_delay=4,
+                 failure_threshold=3, cooldown=30, negative_ttl=60):
+        self.timeout = timeout
+        self.deadline = deadline
+        self.base_delays = {NOT_READY: not_ready_delay, SERVER_ERROR: server_error_delay}
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.negative_ttl = negative_ttl
+        self.breakers = {}
+        self.negative_cache = {}
+        self.lock = threading.Lock()
+
+    def breaker_for(self, url):
+        parts = urlsplit(url)
+        endpoint = f"{parts.scheme}://{parts.netloc}"
+        with self.lock:
+            if endpoint not in self.breakers:
+                self.breakers[endpoint] = CircuitBreaker(self.failure_threshold, self.cooldown)
+            return self.breakers[endpoint]
+
+    def is_negative(self, url):
+        with self.lock:
+            expires = self.negative_cache.get(url)
+            if expires is None:
+                return False
+            if time.monotonic() >= expires:
+                del self.negative_cache[url]
+                return False
+            return True
+
+    def remember_failure(self, url):
+        now = time.monotonic()
+        with self.lock:
+            for expired in [u for u, expires in self.negative_cache.items() if expires <= now]:
+                del self.negative_cache[expired]
+            self.negative_cache[url] = now + self.negative_ttl
+
+    def request(self, url, timeout):
+        import requests
+
+        try:
+            response = requests.get(url, timeout=timeout)
+        except requests.Timeout:
+            return TIMEOUT, None
+        except requests.ConnectionError:
+            # Refused or unreachable: Home Assistant is down, same as a timeout for the breaker
+            return TIMEOUT, None
+        except Exception as e:
+            # Raised before anything reached the endpoint, e.g. a malformed URL
+            logger.debug(f"Snapshot request failed: {e}")
+            return ERROR, None
+
+        if response.status_code == 404:
+            return NOT_READY, None
+        if response.status_code >= 500:
+            return SERVER_ERROR, None
+        if not response.ok:
+            return FAILED, None
+        if 'image' not in response.headers.get('Content-Type', ''):
+            return NOT_READY, None
+        return OK, response.content
+
+    def fetch(self, url):
+        """
+        Return the snapshot bytes, or None if it couldn't be fetched within the deadline.
+        """
+        if self.is_negative(url):
+            logger.debug(f"Skipping snapshot that recently failed: {url}")
+            return None
+
+        breaker = self.breaker_for(url)
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            ticket = breaker.allow()
+            if ticket is None:
+                logger.debug(f"Circuit breaker open, skipping snapshot: {url}")
+                return None
+
+            remaining = deadline - time.monotonic()
+            outcome, content = self.request(url, min(self.timeout, max(remaining, 0.1)))
+            attempt += 1
+            logger.debug(f"Snapshot fetch attempt {attempt}: {outcome} ({url})")
+
+            if outcome in (OK, NOT_READY, FAILED):
+                breaker.record_success(ticket)
+            elif outcome in (SERVER_ERROR, TIMEOUT):
+                breaker.record_failure(ticket)
+            else:
+                breaker.release(ticket)
+
+            if outcome == OK:
+                return content
+            if outcome in (FAILED, ERROR):
+                # Other client errors and malformed URLs won't fix themselves
+                break
+            if outcome == TIMEOUT or breaker.opened_at is not None:
+                # A timeout already used up most of the budget, and outages are the breaker's job,
+                # so don't remember the URL itself
+                return None
+
+            base = self.base_delays[outcome]
+            delay = random.uniform(0, min(self.max_delay, base * 2 ** attempt))
+            if time.monotonic() + delay >= deadline:
+                break
+            time.sleep(delay)
+
+        self.remember_failure(url)
+        return None
@@ -1,45 +1,322 @@
+import argparse
+import json
+import logging
+import os
 import smtplib
+import socket
+import socketserver
+import ssl
+import struct
+import threading
+import time
+from email.mime.image import MIMEImage
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-import logging
-import json
 
 # Set up logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+PHASES = ["dns", "connect", "greeting", "starttls", "auth", "data", "total"]
+PERCENTILES = [50, 90, 95, 99]
+
+
+class TimedSMTP(smtplib.SMTP):
+    """
+    SMTP client that times DNS resolution and the TCP connect separately.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.timings = {}
+        super().__init__(*args, **kwargs)
+
+    def _get_socket(self, host, port, timeout):
+        start = time.perf_counter()
+        addresses = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        self.timings["dns"] = time.perf_counter() - start
+
+        last_error = OSError(f"No addresses found for {host}")
+        start = time.perf_counter()
+        for family, socktype, proto, _, address in addresses:
+            sock = socket.socket(family, socktype, proto)
+            sock.settimeout(timeout)
+            try:
+                sock.connect(address)
+            except OSError as e:
+                sock.close()
+                last_error = e
+                continue
+            self.timings["connect"] = time.perf_counter() - start
+            return sock
+        raise last_error
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    """
+    Minimal SMTP server that accepts and discards every message.
+    """
+
+    def reply(self, *lines):
+        # One write per reply, so multi-line responses don't stall on Nagle/delayed ACK
+        self.wfile.write("".join(f"{line}\r\n" for line in lines).encode("ascii"))
+
+    def handle(self):
+        self.reply("220 mailtest sink ready")
+        for raw in self.rfile:
+            command = raw.decode("utf-8", "replace").strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250-mailtest sink", "250 8BITMIME")
+            elif command.startswith("DATA"):
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                for data_line in self.rfile:
+                    if data_line.rstrip(b"\r\n") == b".":
+                        break
+                self.server.received += 1
+                self.reply("250 OK: queued")
+            elif command.startswith("QUIT"):
+                self.reply("221 Bye")
+                return
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self.reply("250 OK")
+            else:
+                self.reply("502 Command not implemented")
+
+
+def start_sink():
+    """
+    Start a local SMTP sink on a free port, returning (server, port).
+    """
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SinkHandler)
+    server.daemon_threads = True
+    server.received = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+
+def synthetic_jpeg(size):
+    """
+    Build a JPEG-framed payload of roughly `size` bytes, standing in for a Frigate snapshot.
+    """
+    app0 = b"JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00"
+    header = b"\xff\xd8\xff\xe0" + struct.pack(">H", len(app0) + 2) + app0
+    return header + os.urandom(max(size - len(header) - 2, 0)) + b"\xff\xd9"
+
+
+def build_message(settings, index, attachment):
+    msg = MIMEMultipart()
+    msg['Subject'] = f"Test Email {index + 1}/{settings['count']}"
+    msg['From'] = settings["from"]
+    msg['To'] = ", ".join(settings["to"])
+    msg.attach(MIMEText("This is a test email."))
+    for _ in range(settings["attachments"]):
+        msg.attach(MIMEImage(attachment, _subtype="jpeg", name="snapshot.jpg"))
+    return msg.as_string()
+
+
+def open_connection(settings):
+    """
+    Connect, greet, upgrade and authenticate, returning (server, timings).
+    """
+    start = time.perf_counter()
+    server = TimedSMTP(settings["server"], settings["port"], timeout=settings["timeout"])
+    try:
+        server.ehlo()
+        timings = dict(server.timings)
+        timings["greeting"] = time.perf_counter() - start - timings["dns"] - timings["connect"]
+
+        if settings["tls"]:
+            start = time.perf_counter()
+            server.starttls(context=ssl.create_default_context())
+            server.ehlo()
+            timings["starttls"] = time.perf_counter() - start
+
+        if settings["auth"]:
+            start = time.perf_counter()
+            server.login(settings["username"], settings["password"])
+            timings["auth"] = time.perf_counter() - start
+    except Exception:
+        # Callers only close connections that were fully opened
+        server.close()
+        raise
 
-# Load settings from config.json
-with open('config.json', 'r') as f:
-    config = json.load(f)
+    return server, timings
 
-SMTP_SERVER = config["smtp"]["server"]
-SMTP_PORT = config["smtp"]["port"]
-SMTP_USERNAME = config["smtp"]["username"]
-SMTP_PASSWORD = config["smtp"]["password"]
-EMAIL_FROM = config["smtp"]["from"]
-EMAIL_TO = config["smtp"]["to"]
 
-# Function to send the email
-def send_email():
+def send_timed(server, settings, message):
+    start = time.perf_counter()
+    server.sendmail(settings["from"], settings["to"], message)
+    return time.perf_counter() - start
+
+
+def close_quietly(server):
     try:
-        subject = "Test Email"
-        msg = MIMEMultipart()
-        msg['Subject'] = subject
-        msg['From'] = EMAIL_FROM
-        msg['To'] = ", ".join(EMAIL_TO)
-
-        # Add text to the email
-        text = MIMEText("This is a test email.")
-        msg.attach(text)
-
-        # Set up the SMTP server connection and send the email
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USERNAME, SMTP_PASSWORD)
-            server.sendmail(EMAIL_FROM, EMAIL_TO, msg.as_string())
-
-        logging.info(f"Email sent successfully to {', '.join(EMAIL_TO)} with subject: {subject}")
-    except Exception as e:
-        logging.error(f"Failed to send email: {e}")
+        server.quit()
+    except Exception:
+        server.close()
+
+
+def run_fresh(settings, messages):
+    """
+    Open a new connection for every message, as main.py does for each alert.
+    """
+    samples, errors = [], 0
+    for message in messages:
+        start = time.perf_counter()
+        try:
+            server, timings = open_connection(settings)
+            try:
+                timings["data"] = send_timed(server, settings, message)
+            finally:
+                close_quietly(server)
+        except Exception as e:
+            errors += 1
+            logging.error(f"Fresh connection send failed: {e}")
+            continue
+        timings["total"] = time.perf_counter() - start
+        samples.append(timings)
+    return samples, errors
+
+
+def run_reuse(settings, messages):
+    """
+    Send every message over one connection, reconnecting only after a failure.
+    """
+    samples, errors = [], 0
+    server = None
+    for message in messages:
+        start = time.perf_counter()
+        timings = {}
+        try:
+            if server is None:
+                server, timings = open_connection(settings)
+            timings["data"] = send_timed(server, settings, message)
+        except Exception as e:
+            errors += 1
+            logging.error(f"Reused connection send failed: {e}")
+            if server is not None:
+                server.close()
+            server = None
+            continue
+        timings["total"] = time.perf_counter() - start
+        samples.append(timings)
+    if server is not None:
+        close_quietly(server)
+    return samples, errors
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples, errors, wall_time):
+    phases = {}
+    for phase in PHASES:
+        values = [s[phase] * 1000 for s in samples if phase in s]
+        if not values:
+            continue
+        stats = {"count": len(values), "mean_ms": sum(values) / len(values), "max_ms": max(values)}
+        for pct in PERCENTILES:
+            stats[f"p{pct}_ms"] = percentile(values, pct)
+        phases[phase] = stats
+    return {
+        "sent": len(samples),
+        "errors": errors,
+        "wall_time_s": wall_time,
+        "messages_per_minute": len(samples) / wall_time * 60 if wall_time else 0.0,
+        "phases": phases,
+    }
+
+
+def log_summary(mode, summary):
+    logging.info(
+        f"[{mode}] sent {summary['sent']}, errors {summary['errors']}, "
+        f"{summary['messages_per_minute']:.1f} messages/minute"
+    )
+    for phase, stats in summary["phases"].items():
+        logging.info(
+            f"[{mode}] {phase:<8} " + " ".join(f"p{pct}={stats[f'p{pct}_ms']:.1f}ms" for pct in PERCENTILES)
+            + f" max={stats['max_ms']:.1f}ms"
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measure SMTP latency and throughput using the settings in config.json.")
+    parser.add_argument("--config", default="config.json", help="Path to config.json")
+    parser.add_argument("-n", "--count", type=int, default=1, help="Messages to send per mode")
+    parser.add_argument("--attachments", type=int, default=0, help="Synthetic JPEG attachments per message")
+    parser.add_argument("--attachment-kb", type=int, default=200, help="Size of each synthetic JPEG in KiB")
+    parser.add_argument("--mode", choices=["fresh", "reuse", "both"], default="both",
+                        help="New connection per message, one reused connection, or both")
+    parser.add_argument("--server", help="Override the SMTP server from config.json")
+    parser.add_argument("--port", type=int, help="Override the SMTP port from config.json")
+    parser.add_argument("--no-tls", action="store_true", help="Skip STARTTLS")
+    parser.add_argument("--no-auth", action="store_true", help="Skip AUTH")
+    parser.add_argument("--timeout", type=float, default=10, help="Socket timeout in seconds")
+    parser.add_argument("--sink", action="store_true",
+                        help="Send to a built-in local SMTP sink instead of the configured server (implies --no-tls --no-auth)")
+    parser.add_argument("--output", default="mailtest_results.json", help="Where to write the JSON results")
+    args = parser.parse_args(argv)
+    if args.count < 1:
+        parser.error("--count must be at least 1")
+    if args.attachments < 0 or args.attachment_kb < 0:
+        parser.error("--attachments and --attachment-kb must not be negative")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+
+    settings = {
+        "server": args.server or config["smtp"]["server"],
+        "port": args.port or config["smtp"]["port"],
+        "username": config["smtp"]["username"],
+        "password": config["smtp"]["password"],
+        "from": config["smtp"]["from"],
+        "to": config["smtp"]["to"],
+        "count": args.count,
+        "attachments": args.attachments,
+        "attachment_bytes": args.attachment_kb * 1024,
+        "tls": not (args.no_tls or args.sink),
+        "auth": not (args.no_auth or args.sink),
+        "timeout": args.timeout,
+    }
+
+    sink = None
+    if args.sink:
+        sink, settings["port"] = start_sink()
+        settings["server"] = "127.0.0.1"
+        logging.info(f"Started local SMTP sink on port {settings['port']}")
+
+    attachment = synthetic_jpeg(settings["attachment_bytes"])
+    messages = [build_message(settings, i, attachment) for i in range(args.count)]
+    logging.info(f"Sending {args.count} message(s) of {len(messages[0]) / 1024:.0f} KiB to {settings['server']}:{settings['port']}")
+
+    runners = {"fresh": run_fresh, "reuse": run_reuse}
+    modes = list(runners) if args.mode == "both" else [args.mode]
+    results = {"settings": {k: v for k, v in settings.items() if k != "password"}, "modes": {}}
+    for mode in modes:
+        start = time.perf_counter()
+        samples, errors = runners[mode](settings, messages)
+        summary = summarize(samples, errors, time.perf_counter() - start)
+        results["modes"][mode] = summary
+        log_summary(mode, summary)
+
+    if sink is not None:
+        results["sink_received"] = sink.received
+        sink.shutdown()
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    logging.info(f"Results written to {args.output}")
+
+    return 1 if any(summary["errors"] for summary in results["modes"].values()) else 0
+
 
 if __name__ == "__main__":
-    send_email()
+    raise SystemExit(main())
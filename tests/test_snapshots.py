@@ -0,0 +1,142 @@
+import http.server
+import threading
+import time
+
+import pytest
+
+from frigate_smtp import snapshots
+from frigate_smtp.snapshots import CircuitBreaker, SnapshotFetcher
+
+
+class SnapshotHandler(http.server.BaseHTTPRequestHandler):
+    """
+    /missing -> 404, /error -> 503, /ready/<n> -> 404 for the first n requests, anything else -> image.
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.hits.append(self.path)
+        if self.path == "/missing" or (self.path.startswith("/ready/")
+                                       and self.server.hits.count(self.path) <= int(self.path.rsplit("/", 1)[1])):
+            self.send_response(404)
+            self.end_headers()
+        elif self.path == "/error":
+            self.send_response(503)
+            self.end_headers()
+        else:
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.end_headers()
+            self.wfile.write(b"JPEG")
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), SnapshotHandler)
+    httpd.hits = []
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    httpd.base_url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_fetcher(**kwargs):
+    options = {"timeout": 1, "deadline": 1, "not_ready_delay": 0.05, "server_error_delay": 0.05,
+               "max_delay": 0.1, "failure_threshold": 3, "cooldown": 0.3}
+    options.update(kwargs)
+    return SnapshotFetcher(**options)
+
+
+def test_not_ready_retried_until_available(server):
+    assert make_fetcher().fetch(f"{server.base_url}/ready/2") == b"JPEG"
+    assert server.hits.count("/ready/2") == 3
+
+
+def test_not_ready_gives_up_at_deadline_and_is_negatively_cached(server):
+    fetcher = make_fetcher(deadline=0.5)
+    start = time.monotonic()
+    assert fetcher.fetch(f"{server.base_url}/missing") is None
+    assert time.monotonic() - start < 1
+    attempts = server.hits.count("/missing")
+    assert attempts > 1
+
+    assert fetcher.fetch(f"{server.base_url}/missing") is None
+    assert server.hits.count("/missing") == attempts
+    # 404s mean Home Assistant is up, so other snapshots on the host still go through
+    assert fetcher.fetch(f"{server.base_url}/ok") == b"JPEG"
+
+
+def test_server_errors_open_breaker(server):
+    fetcher = make_fetcher(cooldown=30)
+    assert fetcher.fetch(f"{server.base_url}/error") is None
+    assert server.hits.count("/error") == 3
+
+    assert fetcher.fetch(f"{server.base_url}/ok") is None
+    assert "/ok" not in server.hits
+
+
+def test_refused_connections_open_breaker():
+    fetcher = make_fetcher(cooldown=30)
+    start = time.monotonic()
+    for path in ("a", "b", "c", "d"):
+        assert fetcher.fetch(f"http://127.0.0.1:9/{path}") is None
+    assert time.monotonic() - start < 1
+    assert fetcher.breaker_for("http://127.0.0.1:9/").opened_at is not None
+
+
+def test_half_open_trial_closes_breaker(server):
+    fetcher = make_fetcher(cooldown=0.3)
+    fetcher.fetch(f"{server.base_url}/error")
+    assert fetcher.fetch(f"{server.base_url}/ok") is None
+
+    time.sleep(0.35)
+    assert fetcher.fetch(f"{server.base_url}/ok") == b"JPEG"
+    assert fetcher.breaker_for(server.base_url).opened_at is None
+
+
+def test_local_error_trial_does_not_close_breaker(monkeypatch):
+    fetcher = make_fetcher(cooldown=0)
+    breaker = fetcher.breaker_for("http://ha")
+    for _ in range(3):
+        breaker.record_failure(breaker.allow())
+    assert breaker.opened_at is not None
+
+    monkeypatch.setattr(fetcher, "request", lambda url, timeout: (snapshots.ERROR, None))
+    assert fetcher.fetch("http://ha/bad") is None
+    assert breaker.opened_at is not None
+    assert breaker.trial is None
+
+
+def test_late_failure_does_not_end_another_trial():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0)
+    early = breaker.allow()
+    breaker.record_failure(breaker.allow())
+    trial = breaker.allow()
+    assert trial is not None
+
+    # A request started before the breaker opened fails after the trial began
+    breaker.record_failure(early)
+    assert breaker.allow() is None
+
+    breaker.record_success(trial)
+    assert breaker.opened_at is None
+
+
+def test_late_success_does_not_close_breaker_or_end_trial():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0)
+    early = breaker.allow()
+    breaker.record_failure(breaker.allow())
+    trial = breaker.allow()
+    assert trial is not None
+
+    # A request started before the breaker opened succeeds after the trial began
+    breaker.record_success(early)
+    assert breaker.opened_at is not None
+    assert breaker.allow() is None
+
+    breaker.record_failure(trial)
+    assert breaker.opened_at is not None
+    assert breaker.trial is None